@@ -1,7 +1,9 @@
 from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 import json
+import msgpack
 
 from app.core.auth import get_current_active_user, get_current_user_optional
 from app.core.database import get_db
@@ -19,10 +21,10 @@ from app.schemas.chat import (
     ChatHistoryRequest,
     ChatHistoryResponse
 )
-from app.services.workflow_engine import WorkflowEngine
+from app.services.workflow_engine import get_workflow_engine
 
 router = APIRouter()
-workflow_engine = WorkflowEngine()
+workflow_engine = get_workflow_engine()
 
 @router.get("/sessions", response_model=List[ChatSessionSchema])
 def get_chat_sessions(
@@ -158,7 +160,7 @@ def delete_chat_session(
     
     return {"message": "Chat session deleted successfully"}
 
-@router.post("/execute", response_model=ChatExecutionResponse)
+@router.post("/execute", response_model=ChatExecutionResponse, response_class=ORJSONResponse)
 async def execute_chat(
     execution_request: ChatExecutionRequest,
     current_user: User = Depends(get_current_active_user),
@@ -270,7 +272,7 @@ async def execute_chat(
             detail=f"Chat execution failed: {str(e)}"
         )
 
-@router.get("/sessions/{session_id}/messages", response_model=ChatHistoryResponse)
+@router.get("/sessions/{session_id}/messages", response_model=ChatHistoryResponse, response_class=ORJSONResponse)
 def get_chat_messages(
     session_id: int,
     skip: int = Query(0, ge=0),
@@ -314,14 +316,27 @@ async def websocket_chat(
     session_id: int,
     db: Session = Depends(get_db)
 ):
-    """WebSocket endpoint for real-time chat"""
-    await websocket.accept()
+    """WebSocket endpoint for real-time chat
+    
+    Clients that request the "msgpack" subprotocol exchange msgpack binary
+    frames; everyone else gets JSON text frames.
+    """
+    use_msgpack = "msgpack" in websocket.scope.get("subprotocols", [])
+    await websocket.accept(subprotocol="msgpack" if use_msgpack else None)
+    
+    async def send(payload: dict) -> None:
+        if use_msgpack:
+            await websocket.send_bytes(msgpack.packb(payload))
+        else:
+            await websocket.send_text(json.dumps(payload))
     
     try:
         while True:
             # Receive message
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
+            if use_msgpack:
+                message_data = msgpack.unpackb(await websocket.receive_bytes())
+            else:
+                message_data = json.loads(await websocket.receive_text())
             
             # Here you would implement real-time message processing
             # For now, just echo back
@@ -331,12 +346,12 @@ async def websocket_chat(
                 "timestamp": "2025-09-07T14:43:00Z"
             }
             
-            await websocket.send_text(json.dumps(response))
+            await send(response)
             
     except WebSocketDisconnect:
         pass
     except Exception as e:
-        await websocket.send_text(json.dumps({
+        await send({
             "type": "error",
             "message": str(e)
-        }))
+        })
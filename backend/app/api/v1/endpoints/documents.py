@@ -9,10 +9,10 @@ from app.core.config import settings
 from app.core.database import get_db
 from app.models.user import User
 from app.models.document import Document
-from app.services.document_processor import DocumentProcessor
+from app.services.document_processor import get_document_processor
 
 router = APIRouter()
-document_processor = DocumentProcessor()
+document_processor = get_document_processor()
 
 @router.post("/upload", status_code=status.HTTP_201_CREATED)
 async def upload_document(
@@ -1,5 +1,6 @@
 from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_active_user
@@ -15,12 +16,12 @@ from app.schemas.workflow import (
     WorkflowValidationRequest,
     WorkflowValidationResponse
 )
-from app.services.workflow_engine import WorkflowEngine
+from app.services.workflow_engine import get_workflow_engine
 
 router = APIRouter()
-workflow_engine = WorkflowEngine()
+workflow_engine = get_workflow_engine()
 
-@router.get("/", response_model=List[WorkflowSchema])
+@router.get("/", response_model=List[WorkflowSchema], response_class=ORJSONResponse)
 def get_workflows(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
@@ -152,7 +153,7 @@ def delete_workflow(
     
     return {"message": "Workflow deleted successfully"}
 
-@router.post("/{workflow_id}/execute", response_model=WorkflowExecutionResponse)
+@router.post("/{workflow_id}/execute", response_model=WorkflowExecutionResponse, response_class=ORJSONResponse)
 async def execute_workflow(
     workflow_id: int,
     execution_request: WorkflowExecutionRequest,
@@ -29,6 +29,7 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
     GEMINI_API_KEY: Optional[str] = os.getenv("GEMINI_API_KEY")
     SERP_API_KEY: Optional[str] = os.getenv("SERP_API_KEY")
+    SERP_RPS: float = float(os.getenv("SERP_RPS", "5"))  # SerpAPI requests per second
     
     # Vector Store
     CHROMA_URL: str = os.getenv("CHROMA_URL", "http://localhost:8001")
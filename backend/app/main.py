@@ -1,18 +1,25 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 import time
 import uuid
 from typing import List, Dict, Any, Optional
 
+from app.services.web_search import close_http_client
+
 app = FastAPI(
     title="GenAI Stack API",
     description="No-Code Workflow Builder API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
+# Close the pooled web search HTTP client when the server stops
+app.add_event_handler("shutdown", close_http_client)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
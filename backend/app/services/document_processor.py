@@ -1,18 +1,74 @@
+import asyncio
 import os
 import hashlib
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
 import fitz  # PyMuPDF
 from sqlalchemy.orm import Session
 
 from app.models.document import Document
 from app.core.config import settings
-from app.services.vector_store import VectorStoreService
-from app.services.llm_service import LLMService
+from app.services.vector_store import get_vector_store_service
+from app.services.llm_service import get_llm_service
+
+MAX_EXTRACTION_THREADS = 16
+
+def _read_pdf_text(file_path: str) -> str:
+    """Read the text of every non-empty PDF page"""
+    doc = fitz.open(file_path)
+    text_content = []
+    
+    for page_num in range(len(doc)):
+        page = doc.load_page(page_num)
+        text = page.get_text()
+        if text.strip():
+            text_content.append(f"Page {page_num + 1}:\n{text}")
+    
+    doc.close()
+    return "\n\n".join(text_content)
+
+def _read_pdf_metadata(file_path: str) -> Dict[str, Any]:
+    """Read the document information of a PDF file"""
+    doc = fitz.open(file_path)
+    pdf_metadata = doc.metadata
+    
+    metadata = {
+        "title": pdf_metadata.get("title", ""),
+        "author": pdf_metadata.get("author", ""),
+        "creator": pdf_metadata.get("creator", ""),
+        "producer": pdf_metadata.get("producer", ""),
+        "creation_date": pdf_metadata.get("creationDate", ""),
+        "modification_date": pdf_metadata.get("modDate", ""),
+        "page_count": len(doc)
+    }
+    
+    doc.close()
+    return metadata
+
+def _read_text_file(file_path: str) -> str:
+    """Read a plain text file, falling back to latin-1 for non UTF-8 content"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        # Try with different encoding
+        with open(file_path, 'r', encoding='latin-1') as f:
+            return f.read()
 
 class DocumentProcessor:
     def __init__(self):
-        self.vector_store = VectorStoreService()
-        self.llm_service = LLMService()
+        self.vector_store = get_vector_store_service()
+        self.llm_service = get_llm_service()
+        self._extraction_semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _run_blocking(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run blocking file parsing in a worker thread, bounding concurrent threads"""
+        # Created lazily so it binds to the running event loop
+        if self._extraction_semaphore is None:
+            self._extraction_semaphore = asyncio.Semaphore(MAX_EXTRACTION_THREADS)
+        
+        async with self._extraction_semaphore:
+            return await asyncio.to_thread(func, *args)
 
     async def process_document(self, document: Document, db: Session) -> None:
         """Process uploaded document: extract text, generate embeddings, store in vector DB"""
@@ -72,17 +128,7 @@ class DocumentProcessor:
         """Extract text from PDF file"""
         
         try:
-            doc = fitz.open(file_path)
-            text_content = []
-            
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text = page.get_text()
-                if text.strip():
-                    text_content.append(f"Page {page_num + 1}:\n{text}")
-            
-            doc.close()
-            return "\n\n".join(text_content)
+            return await self._run_blocking(_read_pdf_text, file_path)
             
         except Exception as e:
             raise ValueError(f"Error extracting PDF text: {str(e)}")
@@ -91,12 +137,7 @@ class DocumentProcessor:
         """Extract text from plain text file"""
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except UnicodeDecodeError:
-            # Try with different encoding
-            with open(file_path, 'r', encoding='latin-1') as f:
-                return f.read()
+            return await self._run_blocking(_read_text_file, file_path)
         except Exception as e:
             raise ValueError(f"Error reading text file: {str(e)}")
 
@@ -120,20 +161,7 @@ class DocumentProcessor:
         
         if mime_type == "application/pdf":
             try:
-                doc = fitz.open(file_path)
-                pdf_metadata = doc.metadata
-                
-                metadata.update({
-                    "title": pdf_metadata.get("title", ""),
-                    "author": pdf_metadata.get("author", ""),
-                    "creator": pdf_metadata.get("creator", ""),
-                    "producer": pdf_metadata.get("producer", ""),
-                    "creation_date": pdf_metadata.get("creationDate", ""),
-                    "modification_date": pdf_metadata.get("modDate", ""),
-                    "page_count": len(doc)
-                })
-                
-                doc.close()
+                metadata.update(await self._run_blocking(_read_pdf_metadata, file_path))
             except Exception:
                 pass  # Ignore metadata extraction errors
         
@@ -255,3 +283,8 @@ class DocumentProcessor:
         except Exception as e:
             # Log error but don't raise - document deletion should still proceed
             print(f"Error deleting embeddings for document {document.id}: {str(e)}")
+
+@lru_cache()
+def get_document_processor() -> DocumentProcessor:
+    """Get the shared DocumentProcessor instance"""
+    return DocumentProcessor()
@@ -1,5 +1,6 @@
 import openai
 import google.generativeai as genai
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 import time
 
@@ -243,3 +244,8 @@ class LLMService:
         }
         
         return model_info.get(model, {"provider": "unknown"})
+
+@lru_cache()
+def get_llm_service() -> LLMService:
+    """Get the shared LLMService instance"""
+    return LLMService()
@@ -1,17 +1,46 @@
+import string
 import time
-from typing import Dict, Any
+import uuid
+from collections import ChainMap
+from functools import lru_cache
+from typing import Dict, Any, Mapping, Optional, Tuple
 from sqlalchemy.orm import Session
 
 from app.schemas.nodes import NodeType, NodeValidationResponse, NodeExecutionContext, NodeExecutionResult
-from app.services.llm_service import LLMService
-from app.services.vector_store import VectorStoreService
-from app.services.web_search import WebSearchService
+from app.services.llm_service import get_llm_service
+from app.services.vector_store import get_vector_store_service
+from app.services.web_search import get_web_search_service
+
+_SUPPORTED_MODELS = frozenset({"gpt-3.5-turbo", "gpt-4", "gpt-4-turbo", "text-davinci-003"})
+_SUPPORTED_ENGINES = frozenset({"google", "bing", "duckduckgo"})
+_SUPPORTED_FORMATS = frozenset({"text", "json", "markdown"})
+
+_FORMATTER = string.Formatter()
+
+@lru_cache(maxsize=128)
+def _compile_template(template: str) -> Tuple[Tuple[str, Optional[str], Optional[str], Optional[str]], ...]:
+    """Parse an output template once into (literal, field, spec, conversion) segments"""
+    return tuple(_FORMATTER.parse(template))
+
+def _render_template(template: str, mapping: Mapping[str, Any]) -> str:
+    """Render a str.format-style template against a mapping using the cached parse"""
+    parts = []
+    for literal, field_name, format_spec, conversion in _compile_template(template):
+        parts.append(literal)
+        if field_name is None:
+            continue
+        value, _ = _FORMATTER.get_field(field_name, (), mapping)
+        value = _FORMATTER.convert_field(value, conversion)
+        if format_spec and "{" in format_spec:
+            format_spec = _render_template(format_spec, mapping)
+        parts.append(_FORMATTER.format_field(value, format_spec))
+    return "".join(parts)
 
 class NodeProcessor:
     def __init__(self):
-        self.llm_service = LLMService()
-        self.vector_store = VectorStoreService()
-        self.web_search = WebSearchService()
+        self.llm_service = get_llm_service()
+        self.vector_store = get_vector_store_service()
+        self.web_search = get_web_search_service()
 
     async def validate_node_config(
         self, node_type: NodeType, config: Dict[str, Any]
@@ -89,7 +118,7 @@ class NodeProcessor:
         model = config.get("model")
         if not model:
             errors.append("Model is required")
-        elif model not in ["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo", "text-davinci-003"]:
+        elif model not in _SUPPORTED_MODELS:
             errors.append("Unsupported model")
         
         prompt = config.get("prompt")
@@ -118,7 +147,7 @@ class NodeProcessor:
             errors.append("Max results must be between 1 and 20")
         
         search_engine = config.get("search_engine", "google")
-        if search_engine not in ["google", "bing", "duckduckgo"]:
+        if search_engine not in _SUPPORTED_ENGINES:
             errors.append("Unsupported search engine")
         
         return errors
@@ -128,7 +157,7 @@ class NodeProcessor:
         errors = []
         
         format_type = config.get("format", "text")
-        if format_type not in ["text", "json", "markdown"]:
+        if format_type not in _SUPPORTED_FORMATS:
             errors.append("Unsupported output format")
         
         template = config.get("template")
@@ -146,7 +175,8 @@ class NodeProcessor:
     ) -> NodeExecutionResult:
         """Execute a single node"""
         
-        start_time = time.time()
+        start_time = time.perf_counter_ns()
+        node_id = f"{node_type}-{uuid.uuid4()}"
         
         try:
             if node_type == NodeType.USER_QUERY:
@@ -162,20 +192,20 @@ class NodeProcessor:
             else:
                 raise ValueError(f"Unknown node type: {node_type}")
             
-            execution_time = int((time.time() - start_time) * 1000)
+            execution_time = (time.perf_counter_ns() - start_time) // 1_000_000
             
             return NodeExecutionResult(
-                node_id=f"{node_type}-{int(time.time())}",
+                node_id=node_id,
                 status="success",
                 output_data=result,
                 execution_time=execution_time
             )
             
         except Exception as e:
-            execution_time = int((time.time() - start_time) * 1000)
+            execution_time = (time.perf_counter_ns() - start_time) // 1_000_000
             
             return NodeExecutionResult(
-                node_id=f"{node_type}-{int(time.time())}",
+                node_id=node_id,
                 status="error",
                 error_message=str(e),
                 execution_time=execution_time
@@ -221,7 +251,7 @@ class NodeProcessor:
         
         # Combine document content
         context_text = "\n\n".join([
-            f"Document: {doc.get('title', 'Unknown')}\nContent: {doc.get('content', '')}"
+            f"Document: {doc['title']}\nContent: {doc['content']}"
             for doc in documents
         ])
         
@@ -300,6 +330,7 @@ class NodeProcessor:
         """Execute output node"""
         
         response = context.global_context.get("response", context.input_data.get("user_query", ""))
+        documents = context.global_context.get("documents") or []
         format_type = config.get("format", "text")
         include_sources = config.get("include_sources", True)
         template = config.get("template")
@@ -307,9 +338,8 @@ class NodeProcessor:
         if template:
             # Apply template formatting
             try:
-                formatted_response = template.format(
-                    response=response,
-                    **context.global_context
+                formatted_response = _render_template(
+                    template, ChainMap({"response": response}, context.global_context)
                 )
             except KeyError as e:
                 formatted_response = f"Template error: Missing variable {str(e)}"
@@ -322,16 +352,16 @@ class NodeProcessor:
                 "metadata": context.global_context
             }
             if include_sources:
-                output["sources"] = context.global_context.get("documents", [])
+                output["sources"] = documents
         elif format_type == "markdown":
             output = f"# Response\n\n{formatted_response}"
-            if include_sources and context.global_context.get("documents"):
-                sources = [doc.get("title", "Unknown") for doc in context.global_context.get("documents", [])]
+            if include_sources and documents:
+                sources = [doc.get("title", "Unknown") for doc in documents]
                 output += f"\n\n## Sources\n\n" + "\n".join([f"- {source}" for source in sources])
         else:
             output = formatted_response
-            if include_sources and context.global_context.get("documents"):
-                sources = [doc.get("title", "Unknown") for doc in context.global_context.get("documents", [])]
+            if include_sources and documents:
+                sources = [doc.get("title", "Unknown") for doc in documents]
                 output += f"\n\nSources: {', '.join(sources)}"
         
         return {
@@ -339,3 +369,8 @@ class NodeProcessor:
             "format": format_type,
             "include_sources": include_sources
         }
+
+@lru_cache()
+def get_node_processor() -> NodeProcessor:
+    """Get the shared NodeProcessor instance"""
+    return NodeProcessor()
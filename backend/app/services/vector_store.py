@@ -1,20 +1,76 @@
+import asyncio
 import chromadb
+import time
+import numpy as np
 from chromadb.config import Settings
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
 import uuid
 
 from app.core.config import settings
 from app.models.document import Document
 
+def _filter_and_rank(distances: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Return indices of hits meeting the threshold (best first) and all similarities"""
+    similarities = 1.0 - distances
+    keep = np.flatnonzero(similarities >= threshold)
+    kept = similarities[keep]
+    # Chroma returns hits nearest-first, so only sort if that ever doesn't hold
+    if np.any(kept[1:] > kept[:-1]):
+        keep = keep[np.argsort(-kept, kind="stable")]
+    return keep, similarities
+
+# How long cached workflow document presence is trusted before re-checking.
+# Invalidation only reaches this process, so other workers adding or deleting
+# documents are picked up once the entry expires.
+EMPTY_WORKFLOW_TTL = 30.0
+WORKFLOW_DOCS_TTL = 300.0
+
 class VectorStoreService:
     def __init__(self):
-        self.client = chromadb.HttpClient(
-            host=settings.CHROMA_URL.split("://")[1].split(":")[0],
-            port=int(settings.CHROMA_URL.split(":")[-1]) if ":" in settings.CHROMA_URL.split("://")[1] else 8000,
-            settings=Settings(anonymized_telemetry=False)
-        )
+        self.host = settings.CHROMA_URL.split("://")[1].split(":")[0]
+        self.port = int(settings.CHROMA_URL.split(":")[-1]) if ":" in settings.CHROMA_URL.split("://")[1] else 8000
+        self.client = None
+        self._client_lock: Optional[asyncio.Lock] = None
         self.default_collection = settings.CHROMA_COLLECTION_NAME
+        # (collection name, workflow id) -> (has documents, valid until)
+        self._wf_has_docs: Dict[Tuple[str, int], Tuple[bool, float]] = {}
+
+    async def _get_client(self):
+        """Get the shared async ChromaDB client, creating it on first use"""
+        if self.client is None:
+            if self._client_lock is None:
+                self._client_lock = asyncio.Lock()
+            # Concurrent first callers wait for a single client instead of
+            # each creating (and leaking) their own
+            async with self._client_lock:
+                if self.client is None:
+                    self.client = await chromadb.AsyncHttpClient(
+                        host=self.host,
+                        port=self.port,
+                        settings=Settings(anonymized_telemetry=False)
+                    )
+        return self.client
+
+    async def _workflow_has_documents(self, collection, workflow_id: int) -> bool:
+        """Check whether a collection holds any documents for a workflow"""
+        key = (collection.name, workflow_id)
+        cached = self._wf_has_docs.get(key)
+        if cached and time.monotonic() < cached[1]:
+            return cached[0]
+        
+        results = await collection.get(where={"workflow_id": workflow_id}, limit=1, include=[])
+        has_docs = bool(results["ids"])
+        # Another instance may add documents later, so only trust "empty" briefly
+        ttl = WORKFLOW_DOCS_TTL if has_docs else EMPTY_WORKFLOW_TTL
+        self._wf_has_docs[key] = (has_docs, time.monotonic() + ttl)
+        return has_docs
+
+    def _invalidate_workflow_docs(self, collection_name: str) -> None:
+        """Forget cached workflow document presence for a collection"""
+        for key in [key for key in self._wf_has_docs if key[0] == collection_name]:
+            del self._wf_has_docs[key]
 
     async def add_documents(
         self, 
@@ -24,13 +80,14 @@ class VectorStoreService:
         """Add documents to vector store"""
         
         try:
+            client = await self._get_client()
             collection_name = collection_name or self.default_collection
             
             # Get or create collection
             try:
-                collection = self.client.get_collection(collection_name)
+                collection = await client.get_collection(collection_name)
             except Exception:
-                collection = self.client.create_collection(
+                collection = await client.create_collection(
                     name=collection_name,
                     metadata={"hnsw:space": "cosine"}
                 )
@@ -48,13 +105,18 @@ class VectorStoreService:
                 documents_text.append(doc["content"])
             
             # Add to collection
-            collection.add(
+            await collection.add(
                 ids=ids,
                 embeddings=embeddings,
                 metadatas=metadatas,
                 documents=documents_text
             )
             
+            valid_until = time.monotonic() + WORKFLOW_DOCS_TTL
+            for metadata in metadatas:
+                if metadata.get("workflow_id"):
+                    self._wf_has_docs[(collection_name, metadata["workflow_id"])] = (True, valid_until)
+            
         except Exception as e:
             raise ValueError(f"Error adding documents to vector store: {str(e)}")
 
@@ -70,27 +132,32 @@ class VectorStoreService:
         """Search for similar documents"""
         
         try:
-            from app.services.llm_service import LLMService
-            llm_service = LLMService()
-            
-            # Generate query embedding
-            query_embedding = await llm_service.generate_embedding(query)
-            
             collection_name = collection_name or self.default_collection
+            client = await self._get_client()
             
             # Get collection
             try:
-                collection = self.client.get_collection(collection_name)
+                collection = await client.get_collection(collection_name)
             except Exception:
                 return []  # Collection doesn't exist
             
+            # Skip the embedding call entirely when the workflow has nothing indexed
+            if workflow_id and not await self._workflow_has_documents(collection, workflow_id):
+                return []
+            
+            from app.services.llm_service import get_llm_service
+            llm_service = get_llm_service()
+            
+            # Generate query embedding
+            query_embedding = await llm_service.generate_embedding(query)
+            
             # Prepare where clause for workflow filtering
             where_clause = {}
             if workflow_id:
                 where_clause["workflow_id"] = workflow_id
             
             # Perform similarity search
-            results = collection.query(
+            results = await collection.query(
                 query_embeddings=[query_embedding],
                 n_results=k,
                 where=where_clause if where_clause else None,
@@ -100,21 +167,25 @@ class VectorStoreService:
             # Format results
             formatted_results = []
             if results["documents"] and results["documents"][0]:
-                for i in range(len(results["documents"][0])):
-                    distance = results["distances"][0][i] if results["distances"] else 1.0
-                    similarity = 1 - distance  # Convert distance to similarity
-                    
-                    if similarity >= threshold:
-                        formatted_results.append({
-                            "content": results["documents"][0][i],
-                            "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                            "similarity": similarity,
-                            "distance": distance,
-                            "title": results["metadatas"][0][i].get("document_title", "Unknown") if results["metadatas"] else "Unknown"
-                        })
-            
-            # Sort by similarity (highest first)
-            formatted_results.sort(key=lambda x: x["similarity"], reverse=True)
+                documents = results["documents"][0]
+                metadatas = results["metadatas"][0] if results["metadatas"] else None
+                if results["distances"]:
+                    distances = np.asarray(results["distances"][0], dtype=np.float64)
+                else:
+                    distances = np.ones(len(documents))
+                
+                # Filter and sort by similarity (highest first) before building dicts
+                order, similarities = _filter_and_rank(distances, threshold)
+                
+                for i in order.tolist():
+                    metadata = metadatas[i] if metadatas else {}
+                    formatted_results.append({
+                        "content": documents[i],
+                        "metadata": metadata,
+                        "similarity": float(similarities[i]),
+                        "distance": float(distances[i]),
+                        "title": metadata.get("document_title", "Unknown") if metadatas else "Unknown"
+                    })
             
             return formatted_results
             
@@ -129,16 +200,18 @@ class VectorStoreService:
         """Delete documents from vector store"""
         
         try:
+            client = await self._get_client()
             collection_name = collection_name or self.default_collection
             
             # Get collection
             try:
-                collection = self.client.get_collection(collection_name)
+                collection = await client.get_collection(collection_name)
             except Exception:
                 return  # Collection doesn't exist
             
             # Delete documents
-            collection.delete(ids=document_ids)
+            await collection.delete(ids=document_ids)
+            self._invalidate_workflow_docs(collection_name)
             
         except Exception as e:
             raise ValueError(f"Error deleting documents from vector store: {str(e)}")
@@ -154,21 +227,23 @@ class VectorStoreService:
         """Update a document in vector store"""
         
         try:
+            client = await self._get_client()
             collection_name = collection_name or self.default_collection
             
             # Get collection
             try:
-                collection = self.client.get_collection(collection_name)
+                collection = await client.get_collection(collection_name)
             except Exception:
                 raise ValueError(f"Collection {collection_name} not found")
             
             # Update document
-            collection.update(
+            await collection.update(
                 ids=[document_id],
                 embeddings=[embedding],
                 metadatas=[metadata],
                 documents=[content]
             )
+            self._invalidate_workflow_docs(collection_name)
             
         except Exception as e:
             raise ValueError(f"Error updating document in vector store: {str(e)}")
@@ -181,16 +256,17 @@ class VectorStoreService:
         """Get a specific document from vector store"""
         
         try:
+            client = await self._get_client()
             collection_name = collection_name or self.default_collection
             
             # Get collection
             try:
-                collection = self.client.get_collection(collection_name)
+                collection = await client.get_collection(collection_name)
             except Exception:
                 return None
             
             # Get document
-            results = collection.get(
+            results = await collection.get(
                 ids=[document_id],
                 include=["documents", "metadatas", "embeddings"]
             )
@@ -214,16 +290,17 @@ class VectorStoreService:
         """Get statistics about a collection"""
         
         try:
+            client = await self._get_client()
             collection_name = collection_name or self.default_collection
             
             # Get collection
             try:
-                collection = self.client.get_collection(collection_name)
+                collection = await client.get_collection(collection_name)
             except Exception:
                 return {"exists": False, "count": 0}
             
             # Get count
-            count = collection.count()
+            count = await collection.count()
             
             return {
                 "exists": True,
@@ -238,7 +315,8 @@ class VectorStoreService:
         """List all collections"""
         
         try:
-            collections = self.client.list_collections()
+            client = await self._get_client()
+            collections = await client.list_collections()
             return [collection.name for collection in collections]
         except Exception as e:
             raise ValueError(f"Error listing collections: {str(e)}")
@@ -251,7 +329,8 @@ class VectorStoreService:
         """Create a new collection"""
         
         try:
-            self.client.create_collection(
+            client = await self._get_client()
+            await client.create_collection(
                 name=name,
                 metadata=metadata or {"hnsw:space": "cosine"}
             )
@@ -262,7 +341,9 @@ class VectorStoreService:
         """Delete a collection"""
         
         try:
-            self.client.delete_collection(name=name)
+            client = await self._get_client()
+            await client.delete_collection(name=name)
+            self._invalidate_workflow_docs(name)
         except Exception as e:
             raise ValueError(f"Error deleting collection: {str(e)}")
 
@@ -270,13 +351,20 @@ class VectorStoreService:
         """Reset a collection (delete all documents)"""
         
         try:
+            client = await self._get_client()
             # Get collection
-            collection = self.client.get_collection(name)
+            collection = await client.get_collection(name)
+            metadata = collection.metadata
+            
+            # Drop and recreate rather than enumerating every document ID
+            await client.delete_collection(name=name)
+            await client.create_collection(name=name, metadata=metadata)
+            self._invalidate_workflow_docs(name)
             
-            # Get all document IDs
-            results = collection.get(include=[])
-            if results["ids"]:
-                collection.delete(ids=results["ids"])
-                
         except Exception as e:
             raise ValueError(f"Error resetting collection: {str(e)}")
+
+@lru_cache()
+def get_vector_store_service() -> VectorStoreService:
+    """Get the shared VectorStoreService instance"""
+    return VectorStoreService()
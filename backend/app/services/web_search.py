@@ -1,13 +1,131 @@
+import asyncio
 import httpx
-from typing import List, Dict, Any, Optional
-from serpapi import GoogleSearch
+import ijson
+import orjson
+import random
+import time
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, List, Dict, Any, Optional
 
 from app.core.config import settings
 
+SEARCH_TIMEOUT = 10.0
+SERPAPI_URL = "https://serpapi.com/search.json"
+SUGGESTIONS_URL = "https://suggestqueries.google.com/complete/search"
+SEARCH_CACHE_SIZE = 1024
+SEARCH_CACHE_TTL = 600  # seconds
+STREAM_MIN_BYTES = 16 * 1024  # smaller responses are parsed in one go
+SERPAPI_MAX_ATTEMPTS = 5
+SERPAPI_BACKOFF_BASE = 0.25  # seconds, doubled on each retry
+API_KEY_CHECK_TTL = 60.0  # seconds
+
+# Shared across all WebSearchService instances so connections are reused
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the pooled HTTP/2 client used for web search, creating it if needed"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=SEARCH_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=20,
+                keepalive_expiry=30
+            )
+        )
+    return _http_client
+
+class _AsyncByteReader:
+    """Adapt an async byte iterator to the async read() interface ijson expects"""
+    
+    def __init__(self, chunks):
+        self._chunks = chunks.__aiter__()
+        self._buffer = b""
+
+    async def read(self, size: int = -1) -> bytes:
+        # ijson probes the stream with read(0), so honour size instead of
+        # handing out (and losing) a whole chunk
+        if size == 0:
+            return b""
+        if not self._buffer:
+            try:
+                self._buffer = await self._chunks.__anext__()
+            except StopAsyncIteration:
+                return b""
+        if 0 < size < len(self._buffer):
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        else:
+            data, self._buffer = self._buffer, b""
+        return data
+
+async def close_http_client() -> None:
+    """Close the pooled web search HTTP client"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 class WebSearchService:
     def __init__(self):
         self.serp_api_key = settings.SERP_API_KEY
-        self.timeout = 10.0
+        self.timeout = SEARCH_TIMEOUT
+        self._search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self._serp_limiter = AsyncLimiter(settings.SERP_RPS, 1)
+        self._key_valid = False
+        self._key_valid_until = 0.0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return get_http_client()
+
+    @asynccontextmanager
+    async def _serpapi_stream(self, params: Dict[str, Any]) -> AsyncIterator[httpx.Response]:
+        """Open a rate-limited SerpAPI Google query, retrying on 429 and 5xx responses"""
+        request_params = {"engine": "google", "api_key": self.serp_api_key, **params}
+        
+        for attempt in range(SERPAPI_MAX_ATTEMPTS):
+            async with self._serp_limiter:
+                async with self.client.stream("GET", SERPAPI_URL, params=request_params) as response:
+                    retryable = response.status_code == 429 or response.status_code >= 500
+                    if not retryable or attempt == SERPAPI_MAX_ATTEMPTS - 1:
+                        yield response
+                        return
+            
+            await asyncio.sleep(SERPAPI_BACKOFF_BASE * 2 ** attempt + random.random())
+
+    async def _serpapi_request(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a SerpAPI Google query and return the decoded response"""
+        async with self._serpapi_stream(params) as response:
+            await response.aread()
+            return orjson.loads(response.content)
+
+    async def _serpapi_results(
+        self, params: Dict[str, Any], results_key: str, max_results: int
+    ) -> List[Dict[str, Any]]:
+        """Run a SerpAPI Google query and return up to max_results items of one result list"""
+        async with self._serpapi_stream(params) as response:
+            content_length = int(response.headers.get("content-length", 0))
+            if 0 < content_length < STREAM_MIN_BYTES:
+                await response.aread()
+                return orjson.loads(response.content).get(results_key, [])[:max_results]
+            
+            # Only materialize the records we keep instead of the whole payload
+            items = []
+            if max_results <= 0:
+                return items
+            async for item in ijson.items(
+                _AsyncByteReader(response.aiter_bytes()), f"{results_key}.item", use_float=True
+            ):
+                items.append(item)
+                if len(items) >= max_results:
+                    break
+            return items
 
     async def search(
         self,
@@ -20,15 +138,58 @@ class WebSearchService:
     ) -> List[Dict[str, Any]]:
         """Perform web search using specified engine"""
         
-        if engine == "google" and self.serp_api_key:
-            return await self._search_with_serpapi(
+        use_serpapi = engine == "google" and bool(self.serp_api_key)
+        cache_key = (
+            use_serpapi,
+            " ".join(query.lower().split()),
+            max_results,
+            country,
+            language,
+            safe_search
+        )
+        
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        # Concurrent identical searches share a single upstream request
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._search_uncached(
+                cache_key, use_serpapi, query, max_results, country, language, safe_search
+            ))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        
+        # Shield so one cancelled caller doesn't cancel the search for the others
+        results = await asyncio.shield(task)
+        return list(results)
+
+    async def _search_uncached(
+        self,
+        cache_key: tuple,
+        use_serpapi: bool,
+        query: str,
+        max_results: int,
+        country: str,
+        language: str,
+        safe_search: str
+    ) -> List[Dict[str, Any]]:
+        """Run a search against the selected engine and cache the results"""
+        
+        if use_serpapi:
+            results = await self._search_with_serpapi(
                 query, max_results, country, language, safe_search
             )
-        elif engine == "duckduckgo":
-            return await self._search_with_duckduckgo(query, max_results)
         else:
-            # Fallback to DuckDuckGo if no API key
-            return await self._search_with_duckduckgo(query, max_results)
+            # DuckDuckGo, also the fallback when there is no SerpAPI key
+            results = await self._search_with_duckduckgo(query, max_results)
+        
+        # Don't cache demo results produced when the real search failed
+        if not any(result.get("source") == "mock" for result in results):
+            self._search_cache[cache_key] = results
+        
+        return results
 
     async def _search_with_serpapi(
         self,
@@ -41,22 +202,16 @@ class WebSearchService:
         """Search using SerpAPI (Google)"""
         
         try:
-            search = GoogleSearch({
+            results = await self._serpapi_results({
                 "q": query,
-                "api_key": self.serp_api_key,
                 "num": max_results,
                 "gl": country,
                 "hl": language,
                 "safe": safe_search
-            })
-            
-            results = search.get_dict()
-            
-            if "organic_results" not in results:
-                return []
+            }, "organic_results", max_results)
             
             formatted_results = []
-            for result in results["organic_results"][:max_results]:
+            for result in results:
                 formatted_results.append({
                     "title": result.get("title", ""),
                     "link": result.get("link", ""),
@@ -77,46 +232,44 @@ class WebSearchService:
         
         try:
             # DuckDuckGo Instant Answer API
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    "https://api.duckduckgo.com/",
-                    params={
-                        "q": query,
-                        "format": "json",
-                        "no_html": "1",
-                        "skip_disambig": "1"
-                    }
-                )
-                
-                if response.status_code != 200:
-                    raise ValueError(f"DuckDuckGo API returned status {response.status_code}")
-                
-                data = response.json()
-                
-                formatted_results = []
-                
-                # Add instant answer if available
-                if data.get("Abstract"):
+            async with self.client.stream(
+                "GET",
+                "https://api.duckduckgo.com/",
+                params={
+                    "q": query,
+                    "format": "json",
+                    "no_html": "1",
+                    "skip_disambig": "1"
+                }
+            ) as response:
+                # Fail before downloading the body of an error response
+                response.raise_for_status()
+                data = orjson.loads(await response.aread())
+            
+            formatted_results = []
+            
+            # Add instant answer if available
+            if data.get("Abstract"):
+                formatted_results.append({
+                    "title": data.get("Heading", query),
+                    "link": data.get("AbstractURL", ""),
+                    "snippet": data.get("Abstract", ""),
+                    "position": 1,
+                    "source": "duckduckgo_instant"
+                })
+            
+            # Add related topics
+            for i, topic in enumerate(data.get("RelatedTopics", [])[:max_results-1]):
+                if isinstance(topic, dict) and topic.get("Text"):
                     formatted_results.append({
-                        "title": data.get("Heading", query),
-                        "link": data.get("AbstractURL", ""),
-                        "snippet": data.get("Abstract", ""),
-                        "position": 1,
-                        "source": "duckduckgo_instant"
+                        "title": topic.get("FirstURL", "").split("/")[-1].replace("_", " "),
+                        "link": topic.get("FirstURL", ""),
+                        "snippet": topic.get("Text", ""),
+                        "position": i + 2,
+                        "source": "duckduckgo_related"
                     })
-                
-                # Add related topics
-                for i, topic in enumerate(data.get("RelatedTopics", [])[:max_results-1]):
-                    if isinstance(topic, dict) and topic.get("Text"):
-                        formatted_results.append({
-                            "title": topic.get("FirstURL", "").split("/")[-1].replace("_", " "),
-                            "link": topic.get("FirstURL", ""),
-                            "snippet": topic.get("Text", ""),
-                            "position": i + 2,
-                            "source": "duckduckgo_related"
-                        })
-                
-                return formatted_results[:max_results]
+            
+            return formatted_results[:max_results]
                 
         except Exception as e:
             # Fallback to mock results for demo purposes
@@ -153,22 +306,16 @@ class WebSearchService:
             return []
         
         try:
-            search = GoogleSearch({
+            results = await self._serpapi_results({
                 "q": query,
-                "api_key": self.serp_api_key,
                 "tbm": "nws",  # News search
                 "num": max_results,
                 "gl": country,
                 "hl": language
-            })
-            
-            results = search.get_dict()
-            
-            if "news_results" not in results:
-                return []
+            }, "news_results", max_results)
             
             formatted_results = []
-            for result in results["news_results"][:max_results]:
+            for result in results:
                 formatted_results.append({
                     "title": result.get("title", ""),
                     "link": result.get("link", ""),
@@ -196,22 +343,16 @@ class WebSearchService:
             return []
         
         try:
-            search = GoogleSearch({
+            results = await self._serpapi_results({
                 "q": query,
-                "api_key": self.serp_api_key,
                 "tbm": "isch",  # Image search
                 "num": max_results,
                 "imgsz": size,
                 "imgtype": type
-            })
-            
-            results = search.get_dict()
-            
-            if "images_results" not in results:
-                return []
+            }, "images_results", max_results)
             
             formatted_results = []
-            for result in results["images_results"][:max_results]:
+            for result in results:
                 formatted_results.append({
                     "title": result.get("title", ""),
                     "link": result.get("link", ""),
@@ -230,26 +371,37 @@ class WebSearchService:
         """Get search suggestions for a query"""
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    "https://suggestqueries.google.com/complete/search",
-                    params={
-                        "client": "firefox",
-                        "q": query
-                    }
-                )
-                
-                if response.status_code == 200:
-                    # Parse JSON response
-                    data = response.json()
-                    if len(data) > 1 and isinstance(data[1], list):
-                        return data[1][:5]  # Return top 5 suggestions
+            async with self.client.stream(
+                "GET",
+                SUGGESTIONS_URL,
+                params={
+                    "client": "firefox",
+                    "q": query
+                }
+            ) as response:
+                if response.status_code != 200:
+                    return []
                 
-                return []
+                # Parse JSON response; decode text first as it isn't always UTF-8
+                await response.aread()
+                data = orjson.loads(response.text)
+            
+            if len(data) > 1 and isinstance(data[1], list):
+                return data[1][:5]  # Return top 5 suggestions
+            
+            return []
                 
         except Exception as e:
             return []
 
+    async def search_many_suggestions(self, queries: List[str]) -> List[List[str]]:
+        """Get search suggestions for several queries concurrently"""
+        
+        # Requests multiplex over the shared HTTP/2 connection
+        return list(await asyncio.gather(
+            *(self.get_search_suggestions(query) for query in queries)
+        ))
+
     def get_search_engines(self) -> List[str]:
         """Get list of available search engines"""
         
@@ -266,15 +418,24 @@ class WebSearchService:
         if not self.serp_api_key:
             return False
         
+        # Each check spends a SerpAPI credit, so reuse a recent answer
+        if time.monotonic() < self._key_valid_until:
+            return self._key_valid
+        
         try:
-            search = GoogleSearch({
+            results = await self._serpapi_request({
                 "q": "test",
-                "api_key": self.serp_api_key,
                 "num": 1
             })
             
-            results = search.get_dict()
-            return "error" not in results
-            
         except Exception:
             return False
+        
+        self._key_valid = "error" not in results
+        self._key_valid_until = time.monotonic() + API_KEY_CHECK_TTL
+        return self._key_valid
+
+@lru_cache()
+def get_web_search_service() -> WebSearchService:
+    """Get the shared WebSearchService instance"""
+    return WebSearchService()
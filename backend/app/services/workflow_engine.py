@@ -1,6 +1,12 @@
+import asyncio
+import hashlib
 import time
 import uuid
-from typing import Dict, Any, List, Optional
+import orjson
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime
 
@@ -8,17 +14,28 @@ from app.models.workflow import Workflow
 from app.models.user import User
 from app.schemas.workflow import WorkflowExecutionResponse, WorkflowValidationResponse
 from app.schemas.nodes import NodeType, WorkflowConfiguration
-from app.services.node_processor import NodeProcessor
-from app.services.llm_service import LLMService
-from app.services.vector_store import VectorStoreService
-from app.services.web_search import WebSearchService
+from app.services.node_processor import get_node_processor
+from app.services.llm_service import get_llm_service
+from app.services.vector_store import get_vector_store_service
+from app.services.web_search import get_web_search_service
+
+_NODE_TYPE_VALUES = frozenset(node_type.value for node_type in NodeType)
+
+PLAN_CACHE_SIZE = 256
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """Execution levels and upstream node map derived from a workflow configuration"""
+    execution_levels: List[List[Tuple[Dict, NodeType]]]
+    upstream: Dict[str, List[Tuple[str, NodeType]]]
 
 class WorkflowEngine:
     def __init__(self):
-        self.node_processor = NodeProcessor()
-        self.llm_service = LLMService()
-        self.vector_store = VectorStoreService()
-        self.web_search = WebSearchService()
+        self.node_processor = get_node_processor()
+        self.llm_service = get_llm_service()
+        self.vector_store = get_vector_store_service()
+        self.web_search = get_web_search_service()
+        self._plan_cache: "OrderedDict[Tuple[int, bytes], ExecutionPlan]" = OrderedDict()
 
     async def execute_workflow(
         self,
@@ -36,14 +53,12 @@ class WorkflowEngine:
         try:
             # Parse workflow configuration
             configuration = workflow.configuration
-            nodes = configuration.get("nodes", [])
-            edges = configuration.get("edges", [])
             
-            if not nodes:
+            if not configuration.get("nodes"):
                 raise ValueError("Workflow has no nodes")
             
-            # Build execution order
-            execution_order = self._build_execution_order(nodes, edges)
+            # Build (or reuse) execution levels
+            plan = self._get_execution_plan(workflow.id, configuration)
             
             # Execute nodes in order
             context = {
@@ -54,7 +69,7 @@ class WorkflowEngine:
                 "execution_id": execution_id
             }
             
-            result = await self._execute_nodes(execution_order, context, db)
+            result = await self._execute_nodes(plan.execution_levels, plan.upstream, context, db)
             
             execution_time = int((time.time() - start_time) * 1000)
             
@@ -77,14 +92,41 @@ class WorkflowEngine:
                 timestamp=datetime.utcnow()
             )
 
-    def _build_execution_order(self, nodes: List[Dict], edges: List[Dict]) -> List[Dict]:
-        """Build execution order based on node connections"""
+    def _get_execution_plan(self, workflow_id: int, configuration: Dict[str, Any]) -> ExecutionPlan:
+        """Get the execution plan for a workflow configuration, building it on a cache miss"""
+        
+        config_hash = hashlib.blake2b(
+            orjson.dumps(configuration, option=orjson.OPT_SORT_KEYS), digest_size=16
+        ).digest()
+        key = (workflow_id, config_hash)
+        
+        plan = self._plan_cache.get(key)
+        if plan is not None:
+            self._plan_cache.move_to_end(key)
+            return plan
+        
+        execution_levels, upstream = self._build_execution_order(
+            configuration.get("nodes", []), configuration.get("edges", [])
+        )
+        plan = ExecutionPlan(execution_levels=execution_levels, upstream=upstream)
+        
+        self._plan_cache[key] = plan
+        if len(self._plan_cache) > PLAN_CACHE_SIZE:
+            self._plan_cache.popitem(last=False)
+        
+        return plan
+
+    def _build_execution_order(
+        self, nodes: List[Dict], edges: List[Dict]
+    ) -> Tuple[List[List[Tuple[Dict, NodeType]]], Dict[str, List[Tuple[str, NodeType]]]]:
+        """Build execution levels of mutually independent nodes and each node's upstream nodes"""
         
-        # Create node lookup
-        node_map = {node["id"]: node for node in nodes}
+        # Create node lookup, resolving each node type once
+        node_map = {node["id"]: (node, NodeType(node["type"])) for node in nodes}
         
         # Build adjacency list
         adjacency = {node["id"]: [] for node in nodes}
+        predecessors = {node["id"]: [] for node in nodes}
         in_degree = {node["id"]: 0 for node in nodes}
         
         for edge in edges:
@@ -92,59 +134,79 @@ class WorkflowEngine:
             target = edge["target"]
             if source in adjacency and target in adjacency:
                 adjacency[source].append(target)
+                predecessors[target].append(source)
                 in_degree[target] += 1
         
-        # Topological sort
-        queue = [node_id for node_id, degree in in_degree.items() if degree == 0]
-        execution_order = []
+        # Topological sort, one breadth-first layer at a time
+        level = [node_id for node_id, degree in in_degree.items() if degree == 0]
+        execution_levels = []
+        scheduled = 0
         
-        while queue:
-            current_id = queue.pop(0)
-            execution_order.append(node_map[current_id])
+        while level:
+            execution_levels.append([node_map[node_id] for node_id in level])
+            scheduled += len(level)
             
-            for neighbor in adjacency[current_id]:
-                in_degree[neighbor] -= 1
-                if in_degree[neighbor] == 0:
-                    queue.append(neighbor)
-        
-        if len(execution_order) != len(nodes):
+            next_level = []
+            for current_id in level:
+                for neighbor in adjacency[current_id]:
+                    in_degree[neighbor] -= 1
+                    if in_degree[neighbor] == 0:
+                        next_level.append(neighbor)
+            level = next_level
+        
+        if scheduled != len(nodes):
             raise ValueError("Workflow contains cycles")
         
-        return execution_order
+        # Collect every node upstream of each node, in execution order
+        position = {}
+        ancestor_ids = {}
+        upstream = {}
+        for level in execution_levels:
+            for node, _ in level:
+                node_id = node["id"]
+                position[node_id] = len(position)
+                ancestors = set(predecessors[node_id])
+                for predecessor in predecessors[node_id]:
+                    ancestors.update(ancestor_ids[predecessor])
+                ancestor_ids[node_id] = ancestors
+                upstream[node_id] = [
+                    (ancestor_id, node_map[ancestor_id][1])
+                    for ancestor_id in sorted(ancestors, key=position.__getitem__)
+                ]
+        
+        return execution_levels, upstream
 
     async def _execute_nodes(
         self, 
-        execution_order: List[Dict], 
+        execution_levels: List[List[Tuple[Dict, NodeType]]], 
+        upstream: Dict[str, List[Tuple[str, NodeType]]],
         context: Dict[str, Any], 
         db: Session
     ) -> Dict[str, Any]:
-        """Execute nodes in the given order"""
+        """Execute nodes level by level, running independent nodes concurrently"""
         
         node_outputs = {}
         final_result = None
         
-        for node in execution_order:
-            node_id = node["id"]
-            node_type = NodeType(node["type"])
-            node_data = node.get("data", {})
+        for level in execution_levels:
+            results = await asyncio.gather(
+                *(
+                    self._run_node(node, node_type, node_outputs, upstream[node["id"]], context, db)
+                    for node, node_type in level
+                ),
+                return_exceptions=True
+            )
             
-            try:
-                # Prepare node input
-                node_input = self._prepare_node_input(node, node_outputs, context)
+            # Merge in level order so outputs don't depend on completion order
+            for (node, node_type), result in zip(level, results):
+                if isinstance(result, BaseException):
+                    raise result
                 
-                # Execute node
-                result = await self._execute_single_node(
-                    node_type, node_data, node_input, context, db
-                )
-                
-                node_outputs[node_id] = result
+                node_outputs[node["id"]] = result
                 
                 # If this is an output node, capture the final result
                 if node_type == NodeType.OUTPUT:
                     final_result = result.get("output", result)
-                    
-            except Exception as e:
-                raise Exception(f"Error executing node {node_id} ({node_type}): {str(e)}")
         
         return {
             "response": final_result or "No output generated",
@@ -152,10 +214,37 @@ class WorkflowEngine:
             "context": context
         }
 
+    async def _run_node(
+        self,
+        node: Dict,
+        node_type: NodeType,
+        node_outputs: Dict[str, Any],
+        upstream_nodes: List[Tuple[str, NodeType]],
+        context: Dict[str, Any],
+        db: Session
+    ) -> Dict[str, Any]:
+        """Prepare input for and execute a single workflow node"""
+        
+        node_id = node["id"]
+        node_data = node.get("data", {})
+        
+        try:
+            # Prepare node input
+            node_input = self._prepare_node_input(node, node_outputs, upstream_nodes, context)
+            
+            # Execute node
+            return await self._execute_single_node(
+                node_type, node_data, node_input, context, db
+            )
+            
+        except Exception as e:
+            raise Exception(f"Error executing node {node_id} ({node_type}): {str(e)}")
+
     def _prepare_node_input(
         self, 
         node: Dict, 
         node_outputs: Dict[str, Any], 
+        upstream_nodes: List[Tuple[str, NodeType]],
         context: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Prepare input data for a node based on its connections"""
@@ -165,15 +254,20 @@ class WorkflowEngine:
             "context": context
         }
         
-        # Add outputs from connected nodes
-        # This is a simplified approach - in a full implementation,
-        # you would trace the edges to get inputs from specific connected nodes
-        for output_key, output_value in node_outputs.items():
+        # Reference upstream outputs under their node type rather than merging
+        # them together; later nodes of the same type take precedence
+        for upstream_id, upstream_type in upstream_nodes:
+            output_value = node_outputs.get(upstream_id)
             if isinstance(output_value, dict):
-                node_input.update(output_value)
+                node_input[upstream_type.value] = output_value
         
         return node_input
 
+    def _get_query(self, node_input: Dict[str, Any]) -> str:
+        """Get the query for a node, preferring the validated user query node output"""
+        user_query_output = node_input.get(NodeType.USER_QUERY.value, {})
+        return user_query_output.get("query") or node_input.get("user_query", "")
+
     async def _execute_single_node(
         self,
         node_type: NodeType,
@@ -220,7 +314,7 @@ class WorkflowEngine:
     ) -> Dict[str, Any]:
         """Execute knowledge base node"""
         
-        query = node_input.get("query", node_input.get("user_query", ""))
+        query = self._get_query(node_input)
         if not query:
             return {"documents": [], "context": ""}
         
@@ -240,7 +334,7 @@ class WorkflowEngine:
             
             # Combine document content
             context_text = "\n\n".join([
-                f"Document: {doc.get('title', 'Unknown')}\nContent: {doc.get('content', '')}"
+                f"Document: {doc['title']}\nContent: {doc['content']}"
                 for doc in documents
             ])
             
@@ -265,8 +359,15 @@ class WorkflowEngine:
     ) -> Dict[str, Any]:
         """Execute LLM engine node"""
         
-        query = node_input.get("query", node_input.get("user_query", ""))
-        document_context = node_input.get("context", "")
+        query = self._get_query(node_input)
+        document_context = "\n\n".join(
+            upstream_context
+            for upstream_context in (
+                node_input.get(NodeType.KNOWLEDGE_BASE.value, {}).get("context"),
+                node_input.get(NodeType.WEB_SEARCH.value, {}).get("context")
+            )
+            if upstream_context
+        )
         
         model = node_data.get("model", "gpt-3.5-turbo")
         prompt = node_data.get("prompt", "You are a helpful assistant.")
@@ -298,7 +399,7 @@ class WorkflowEngine:
     ) -> Dict[str, Any]:
         """Execute web search node"""
         
-        query = node_input.get("query", node_input.get("user_query", ""))
+        query = self._get_query(node_input)
         if not query:
             return {"results": [], "context": ""}
         
@@ -337,7 +438,8 @@ class WorkflowEngine:
         format_type = node_data.get("format", "text")
         include_sources = node_data.get("include_sources", True)
         
-        response = node_input.get("response", "No response generated")
+        response = node_input.get(NodeType.LLM_ENGINE.value, {}).get("response", "No response generated")
+        documents = node_input.get(NodeType.KNOWLEDGE_BASE.value, {}).get("documents") or []
         
         if format_type == "json":
             output = {
@@ -345,11 +447,11 @@ class WorkflowEngine:
                 "metadata": node_input.get("context", {})
             }
             if include_sources:
-                output["sources"] = node_input.get("documents", [])
+                output["sources"] = documents
         else:
             output = response
-            if include_sources and node_input.get("documents"):
-                sources = [doc.get("title", "Unknown") for doc in node_input.get("documents", [])]
+            if include_sources and documents:
+                sources = [doc.get("title", "Unknown") for doc in documents]
                 output += f"\n\nSources: {', '.join(sources)}"
         
         return {"output": output}
@@ -387,9 +489,7 @@ class WorkflowEngine:
                     errors.append(f"Node {node_id} must have a type")
                     continue
                 
-                try:
-                    NodeType(node_type)
-                except ValueError:
+                if node_type not in _NODE_TYPE_VALUES:
                     errors.append(f"Invalid node type: {node_type}")
             
             # Validate edges
@@ -430,3 +530,8 @@ class WorkflowEngine:
                 is_valid=False,
                 errors=[f"Validation error: {str(e)}"]
             )
+
+@lru_cache()
+def get_workflow_engine() -> WorkflowEngine:
+    """Get the shared WorkflowEngine instance"""
+    return WorkflowEngine()
@@ -0,0 +1,108 @@
+import threading
+
+import httpx
+import orjson
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.main import app
+from app.core.database import get_db, Base
+from app.core.auth import get_current_active_user
+from app.models.user import User
+from tests.helpers import JSON_HEADERS, response_json
+
+# Create in-memory test database; StaticPool keeps the single connection (and
+# its schema) alive for the session, and each xdist worker gets its own copy
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # Test data is disposable, so skip durability work on every write
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+FIXTURE_SESSION = orjson.dumps({"title": "Fixture Session", "workflow_id": None})
+FIXTURE_WORKFLOW = orjson.dumps({
+    "name": "Fixture Workflow",
+    "description": "Created by fixture",
+    "configuration": {"nodes": [], "edges": []}
+})
+
+# One session serves every request; tests roll it back instead of reopening it.
+# Requests gathered concurrently take turns on it, since a Session is not
+# thread-safe.
+_session = TestingSessionLocal()
+_session_lock = threading.Lock()
+
+def override_get_db():
+    with _session_lock:
+        yield _session
+
+def override_get_current_user():
+    return User(
+        id=1,
+        email="test@example.com",
+        full_name="Test User",
+        is_active=True
+    )
+
+@pytest.fixture(scope="session", autouse=True)
+def setup_test_database():
+    """Create the test schema and route the app's dependencies to it once per session"""
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_active_user] = override_get_current_user
+    yield
+    app.dependency_overrides.clear()
+    _session.close()
+
+@pytest.fixture(autouse=True)
+def rollback_session():
+    """Discard whatever a test left pending on the shared session"""
+    yield
+    _session.rollback()
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client shared by the whole session so app startup runs once"""
+    with TestClient(app) as c:
+        yield c
+
+@pytest_asyncio.fixture
+async def async_client():
+    """Async client driving the app in-process, for tests that gather requests"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+def _create(client, url, body):
+    response = client.post(url, content=body, headers=JSON_HEADERS)
+    return response_json(response)["id"]
+
+@pytest.fixture
+def chat_session(client):
+    """Chat session created for a single test and removed afterwards"""
+    session_id = _create(client, "/api/v1/chat/sessions", FIXTURE_SESSION)
+    yield session_id
+    client.delete(f"/api/v1/chat/sessions/{session_id}")
+
+@pytest.fixture
+def workflow_id(client):
+    """Workflow created for a single test and removed afterwards"""
+    workflow_id = _create(client, "/api/v1/workflows/", FIXTURE_WORKFLOW)
+    yield workflow_id
+    client.delete(f"/api/v1/workflows/{workflow_id}")
+
@@ -0,0 +1,7 @@
+import orjson
+
+JSON_HEADERS = {"content-type": "application/json"}
+
+def response_json(response):
+    """Decode a test response body with orjson"""
+    return orjson.loads(response.content)
@@ -0,0 +1,150 @@
+import asyncio
+
+import chromadb
+import pytest
+
+from app.services.vector_store import VectorStoreService
+
+class TestVectorStoreClient:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_client(self, monkeypatch):
+        """Test that the async Chroma client is created once for concurrent first calls"""
+        calls = []
+
+        async def fake_async_http_client(host, port, settings):
+            calls.append((host, port))
+            await asyncio.sleep(0)
+            return object()
+
+        monkeypatch.setattr(chromadb, "AsyncHttpClient", fake_async_http_client, raising=False)
+        service = VectorStoreService()
+
+        clients = await asyncio.gather(*(service._get_client() for _ in range(5)))
+
+        assert len(calls) == 1
+        assert calls[0] == (service.host, service.port)
+        assert all(client is clients[0] for client in clients)
+        assert await service._get_client() is clients[0]
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+        self.metadata = {"hnsw:space": "cosine"}
+        self.workflow_ids = []
+        self.get_calls = 0
+
+    async def get(self, where=None, limit=None, include=None):
+        self.get_calls += 1
+        ids = [str(i) for i, wf in enumerate(self.workflow_ids) if wf == where["workflow_id"]]
+        return {"ids": ids[:limit]}
+
+    async def add(self, ids, embeddings, metadatas, documents):
+        self.workflow_ids.extend(metadata.get("workflow_id") for metadata in metadatas)
+
+    async def delete(self, ids):
+        self.workflow_ids.clear()
+
+    async def query(self, query_embeddings, n_results, where, include):
+        return {"documents": [[]], "metadatas": [[]], "distances": [[]]}
+
+class FakeClient:
+    def __init__(self):
+        self.collections = {}
+
+    async def get_collection(self, name):
+        return self.collections[name]
+
+    async def create_collection(self, name, metadata=None):
+        self.collections[name] = FakeCollection(name)
+        return self.collections[name]
+
+    async def delete_collection(self, name):
+        del self.collections[name]
+
+class FakeLLMService:
+    def __init__(self):
+        self.embedding_calls = 0
+
+    async def generate_embedding(self, text):
+        self.embedding_calls += 1
+        return [0.0, 1.0]
+
+@pytest.fixture
+def vector_store(monkeypatch):
+    """VectorStoreService wired to an in-memory fake Chroma client and LLM"""
+    import app.services.llm_service as llm_module
+
+    llm = FakeLLMService()
+    monkeypatch.setattr(llm_module, "get_llm_service", lambda: llm)
+    service = VectorStoreService()
+    service.client = FakeClient()
+    service.llm = llm
+    return service
+
+def _doc(doc_id, workflow_id):
+    return {"id": doc_id, "embedding": [0.0, 1.0], "metadata": {"workflow_id": workflow_id}, "content": "text"}
+
+class TestWorkflowDocsCache:
+
+    @pytest.mark.asyncio
+    async def test_empty_workflow_skips_embedding(self, vector_store):
+        """Test that searching a workflow with no documents never embeds the query"""
+        collection = await vector_store.client.create_collection("docs")
+
+        for _ in range(3):
+            assert await vector_store.similarity_search("query", workflow_id=1, collection_name="docs") == []
+
+        assert vector_store.llm.embedding_calls == 0
+        # Later searches are answered from the cache
+        assert collection.get_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_add_marks_workflow_as_populated(self, vector_store):
+        """Test that adding documents makes a cached empty workflow searchable"""
+        await vector_store.client.create_collection("docs")
+        await vector_store.similarity_search("query", workflow_id=1, collection_name="docs")
+
+        await vector_store.add_documents([_doc(1, 1)], collection_name="docs")
+        await vector_store.similarity_search("query", workflow_id=1, collection_name="docs")
+
+        assert vector_store.llm.embedding_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_delete_invalidates_cache(self, vector_store):
+        """Test that deleting documents forces the workflow to be re-checked"""
+        collection = await vector_store.client.create_collection("docs")
+        await vector_store.add_documents([_doc(1, 1)], collection_name="docs")
+
+        await vector_store.delete_documents(["1"], collection_name="docs")
+        await vector_store.similarity_search("query", workflow_id=1, collection_name="docs")
+
+        assert collection.get_calls == 1
+        assert vector_store.llm.embedding_calls == 0
+
+    @pytest.mark.asyncio
+    async def test_reset_invalidates_cache(self, vector_store):
+        """Test that resetting a collection forgets cached workflow documents"""
+        await vector_store.client.create_collection("docs")
+        await vector_store.add_documents([_doc(1, 1)], collection_name="docs")
+
+        await vector_store.reset_collection("docs")
+        await vector_store.similarity_search("query", workflow_id=1, collection_name="docs")
+
+        assert vector_store.client.collections["docs"].get_calls == 1
+        assert vector_store.llm.embedding_calls == 0
+
+    @pytest.mark.asyncio
+    async def test_populated_entries_expire(self, vector_store):
+        """Test that cached document presence is re-checked once it expires"""
+        collection = await vector_store.client.create_collection("docs")
+        await vector_store.add_documents([_doc(1, 1)], collection_name="docs")
+        has_docs, valid_until = vector_store._wf_has_docs[("docs", 1)]
+        assert has_docs and valid_until != float("inf")
+
+        collection.workflow_ids.clear()  # Removed by another process
+        vector_store._wf_has_docs[("docs", 1)] = (True, 0.0)
+        await vector_store.similarity_search("query", workflow_id=1, collection_name="docs")
+
+        assert collection.get_calls == 1
+        assert vector_store.llm.embedding_calls == 0
@@ -0,0 +1,47 @@
+from contextlib import asynccontextmanager
+
+import httpx
+import orjson
+import pytest
+
+from app.services.web_search import WebSearchService, _AsyncByteReader
+
+def _chunked(body, size):
+    async def chunks():
+        for start in range(0, len(body), size):
+            yield body[start:start + size]
+    return chunks()
+
+class TestWebSearchStreaming:
+
+    @pytest.mark.asyncio
+    async def test_byte_reader_honours_size(self):
+        """Test that read(0) probes do not consume stream data"""
+        reader = _AsyncByteReader(_chunked(b"abcdefgh", 5))
+        assert await reader.read(0) == b""
+        assert await reader.read(3) == b"abc"
+        assert await reader.read() == b"de"
+        assert await reader.read() == b"fgh"
+        assert await reader.read() == b""
+
+    @pytest.mark.asyncio
+    async def test_serpapi_results_streams_chunked_body(self, monkeypatch):
+        """Test parsing a multi-chunk SerpAPI body sent without content-length"""
+        body = orjson.dumps({
+            "search_metadata": {"status": "Success"},
+            "organic_results": [
+                {"title": f"Result {i}", "link": f"https://example.com/{i}", "position": i}
+                for i in range(50)
+            ]
+        })
+
+        @asynccontextmanager
+        async def fake_stream(params):
+            yield httpx.Response(200, content=_chunked(body, 7))
+
+        service = WebSearchService()
+        monkeypatch.setattr(service, "_serpapi_stream", fake_stream)
+
+        items = await service._serpapi_results({"q": "test"}, "organic_results", 5)
+        assert [item["title"] for item in items] == [f"Result {i}" for i in range(5)]
+        assert items[4]["position"] == 4
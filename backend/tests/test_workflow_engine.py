@@ -0,0 +1,140 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.schemas.nodes import NodeType
+from app.services.workflow_engine import WorkflowEngine
+
+# userQuery fans out to knowledge base and web search, which both feed the LLM
+DIAMOND_CONFIGURATION = {
+    "nodes": [
+        {"id": "query", "type": "userQuery", "data": {}},
+        {"id": "kb", "type": "knowledgeBase", "data": {"max_results": 3}},
+        {"id": "web", "type": "webSearch", "data": {"max_results": 3}},
+        {"id": "llm", "type": "llm", "data": {"model": "gpt-4"}},
+        {"id": "out", "type": "output", "data": {"format": "text"}}
+    ],
+    "edges": [
+        {"source": "query", "target": "kb"},
+        {"source": "query", "target": "web"},
+        {"source": "kb", "target": "llm"},
+        {"source": "web", "target": "llm"},
+        {"source": "llm", "target": "out"}
+    ]
+}
+
+class FakeVectorStore:
+    def __init__(self):
+        self.queries = []
+
+    async def similarity_search(self, query, workflow_id, k, threshold, db):
+        self.queries.append(query)
+        await asyncio.sleep(0)
+        return [{"title": "Handbook", "content": "kb text"}]
+
+class FakeWebSearch:
+    def __init__(self):
+        self.queries = []
+
+    async def search(self, query, max_results):
+        self.queries.append(query)
+        await asyncio.sleep(0)
+        return [{"title": "Result", "snippet": "web text"}]
+
+class FakeLLMService:
+    def __init__(self):
+        self.calls = []
+
+    async def generate_response(self, query, context, model, system_prompt, temperature):
+        self.calls.append({"query": query, "context": context, "model": model})
+        return {"content": "answer", "model": model, "tokens_used": 1}
+
+@pytest.fixture
+def engine():
+    """WorkflowEngine with its external services replaced by fakes"""
+    engine = WorkflowEngine()
+    engine.vector_store = FakeVectorStore()
+    engine.web_search = FakeWebSearch()
+    engine.llm_service = FakeLLMService()
+    return engine
+
+def _workflow(configuration, workflow_id=1):
+    return SimpleNamespace(id=workflow_id, configuration=configuration)
+
+class TestWorkflowEngine:
+
+    @pytest.mark.asyncio
+    async def test_diamond_workflow(self, engine):
+        """Test that both branches of a diamond reach the LLM and output nodes"""
+        response = await engine.execute_workflow(
+            _workflow(DIAMOND_CONFIGURATION), {"user_message": "Hello"}, user_id=1
+        )
+
+        assert response.status == "success"
+        assert response.result["response"] == "answer\n\nSources: Handbook"
+        assert engine.vector_store.queries == ["Hello"]
+        assert engine.web_search.queries == ["Hello"]
+
+        llm_call, = engine.llm_service.calls
+        assert llm_call["model"] == "gpt-4"
+        assert "kb text" in llm_call["context"]
+        assert "web text" in llm_call["context"]
+
+        node_outputs = response.result["node_outputs"]
+        assert list(node_outputs) == ["query", "kb", "web", "llm", "out"]
+
+    def test_diamond_plan_levels(self, engine):
+        """Test that independent branches share a level and upstream covers all ancestors"""
+        plan = engine._get_execution_plan(1, DIAMOND_CONFIGURATION)
+
+        levels = [[node["id"] for node, _ in level] for level in plan.execution_levels]
+        assert levels == [["query"], ["kb", "web"], ["llm"], ["out"]]
+        assert plan.upstream["out"] == [
+            ("query", NodeType.USER_QUERY),
+            ("kb", NodeType.KNOWLEDGE_BASE),
+            ("web", NodeType.WEB_SEARCH),
+            ("llm", NodeType.LLM_ENGINE)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_node_failure_in_level(self, engine, monkeypatch):
+        """Test that a failing node stops the workflow after its level finishes"""
+        async def failing_web_search(node_data, node_input):
+            raise RuntimeError("search backend down")
+
+        monkeypatch.setattr(engine, "_execute_web_search_node", failing_web_search)
+
+        response = await engine.execute_workflow(
+            _workflow(DIAMOND_CONFIGURATION), {"user_message": "Hello"}, user_id=1
+        )
+
+        assert response.status == "error"
+        assert "Error executing node web" in response.error
+        assert "search backend down" in response.error
+        # The sibling in the same level still ran, but nothing downstream did
+        assert engine.vector_store.queries == ["Hello"]
+        assert engine.llm_service.calls == []
+
+    def test_plan_cache_hit(self, engine, monkeypatch):
+        """Test that an unchanged configuration reuses the cached plan"""
+        builds = []
+        build_execution_order = engine._build_execution_order
+
+        def counting_build(nodes, edges):
+            builds.append(len(nodes))
+            return build_execution_order(nodes, edges)
+
+        monkeypatch.setattr(engine, "_build_execution_order", counting_build)
+
+        plan = engine._get_execution_plan(1, DIAMOND_CONFIGURATION)
+        # Key order does not matter, only content
+        reordered = {"edges": DIAMOND_CONFIGURATION["edges"], "nodes": DIAMOND_CONFIGURATION["nodes"]}
+        assert engine._get_execution_plan(1, reordered) is plan
+        assert builds == [5]
+
+        # A different workflow or an edited configuration is rebuilt
+        assert engine._get_execution_plan(2, DIAMOND_CONFIGURATION) is not plan
+        edited = {**DIAMOND_CONFIGURATION, "edges": DIAMOND_CONFIGURATION["edges"][:-1]}
+        assert engine._get_execution_plan(1, edited) is not plan
+        assert builds == [5, 5, 5]
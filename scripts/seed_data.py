@@ -8,15 +8,18 @@ This script seeds the database with initial data for development and testing.
 import os
 import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 import json
 
 # Add the backend directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
-from passlib.context import CryptContext
+from sqlalchemy.pool import NullPool, StaticPool
+import bcrypt
 
 from app.models.user import User
 from app.models.workflow import Workflow
@@ -29,277 +32,293 @@ from app.core.config import settings
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing. Seed accounts are for development only, so use the lowest
+# bcrypt cost; the hashes still verify through the app's own CryptContext.
+BCRYPT_ROUNDS = 4
+
+USERS_DATA = [
+    {
+        "email": "admin@genai-stack.com",
+        "password": "admin123",
+        "full_name": "Admin User",
+        "is_superuser": True,
+        "is_active": True,
+        "bio": "System administrator",
+        "company": "GenAI Stack Inc.",
+        "location": "San Francisco, CA"
+    },
+    {
+        "email": "demo@genai-stack.com",
+        "password": "demo123",
+        "full_name": "Demo User",
+        "is_superuser": False,
+        "is_active": True,
+        "bio": "Demo user for testing workflows",
+        "company": "Demo Corp",
+        "location": "New York, NY"
+    },
+    {
+        "email": "john.doe@example.com",
+        "password": "password123",
+        "full_name": "John Doe",
+        "is_superuser": False,
+        "is_active": True,
+        "bio": "Software developer interested in AI workflows",
+        "company": "Tech Innovations",
+        "location": "Austin, TX"
+    }
+]
 
 def get_password_hash(password: str) -> str:
     """Generate password hash"""
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS, prefix=b"2b")).decode("ascii")
 
 def create_engine_and_session():
     """Create database engine and session"""
-    engine = create_engine(settings.DATABASE_URL)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    url = make_url(settings.DATABASE_URL)
+    # The script holds one connection for its whole run, so skip pooling
+    engine_options = {"poolclass": StaticPool if url.get_backend_name() == "sqlite" else NullPool}
+    if url.get_driver_name() == "psycopg2":
+        # Send bulk inserts as multi-row VALUES pages rather than one
+        # statement per row
+        engine_options["executemany_mode"] = "values_plus_batch"
+    engine = create_engine(url, **engine_options)
+    # Seeded objects are not re-read after commit, so skip expiring them
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
     return engine, SessionLocal()
 
+def seed_database():
+    """Run every seeding step inside a single transaction"""
+    engine, db = create_engine_and_session()
+    try:
+        with db, db.begin():
+            users = seed_users(db)
+            seed_workflows(db, users)
+    finally:
+        engine.dispose()
+
 def seed_users(db):
-    """Seed user data"""
+    """Seed user data; the caller owns the transaction"""
     logger.info("Seeding users...")
     
-    users_data = [
-        {
-            "email": "admin@genai-stack.com",
-            "password": "admin123",
-            "full_name": "Admin User",
-            "is_superuser": True,
-            "is_active": True,
-            "bio": "System administrator",
-            "company": "GenAI Stack Inc.",
-            "location": "San Francisco, CA"
-        },
-        {
-            "email": "demo@genai-stack.com",
-            "password": "demo123",
-            "full_name": "Demo User",
-            "is_superuser": False,
-            "is_active": True,
-            "bio": "Demo user for testing workflows",
-            "company": "Demo Corp",
-            "location": "New York, NY"
-        },
-        {
-            "email": "john.doe@example.com",
-            "password": "password123",
-            "full_name": "John Doe",
-            "is_superuser": False,
-            "is_active": True,
-            "bio": "Software developer interested in AI workflows",
-            "company": "Tech Innovations",
-            "location": "Austin, TX"
-        }
-    ]
+    # Look up existing users in one query so a re-seed hashes nothing
+    emails = [user_data["email"] for user_data in USERS_DATA]
+    existing_users = {
+        user.email: user
+        for user in db.scalars(select(User).where(User.email.in_(emails)))
+    }
+    new_users = [user_data for user_data in USERS_DATA if user_data["email"] not in existing_users]
     
-    created_users = []
-    for user_data in users_data:
-        # Check if user already exists
-        existing_user = db.query(User).filter(User.email == user_data["email"]).first()
-        if existing_user:
-            logger.info(f"User {user_data['email']} already exists, skipping...")
-            created_users.append(existing_user)
-            continue
-        
-        # Create new user
-        password = user_data.pop("password")
-        user = User(
-            **user_data,
-            password_hash=get_password_hash(password)
-        )
+    for email in existing_users:
+        logger.info(f"User {email} already exists, skipping...")
+    
+    users_by_email = dict(existing_users)
+    if new_users:
+        # bcrypt releases the GIL, so the new passwords hash in parallel threads
+        with ThreadPoolExecutor(max_workers=min(len(new_users), os.cpu_count() or 1)) as executor:
+            password_hashes = dict(zip(
+                (user_data["email"] for user_data in new_users),
+                executor.map(get_password_hash, [user_data["password"] for user_data in new_users])
+            ))
         
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-        created_users.append(user)
-        logger.info(f"Created user: {user.email}")
+        # Create all new users in one INSERT ... RETURNING
+        rows = [
+            dict(
+                {key: value for key, value in user_data.items() if key != "password"},
+                password_hash=password_hashes[user_data["email"]]
+            )
+            for user_data in new_users
+        ]
+        inserted = db.scalars(
+            insert(User).returning(User, sort_by_parameter_order=True),
+            rows
+        ).all()
+        for user in inserted:
+            users_by_email[user.email] = user
+            logger.info(f"Created user: {user.email}")
     
-    return created_users
+    return [users_by_email[email] for email in emails]
 
 def seed_workflows(db, users):
-    """Seed workflow data"""
+    """Seed workflow data; the caller owns the transaction"""
     logger.info("Seeding workflows...")
     
-    # Sample workflow configurations
     workflows_data = [
-        {
-            "name": "Customer Support Bot",
-            "description": "AI-powered customer support workflow that answers questions using knowledge base",
-            "owner": users[0],  # Admin user
-            "configuration": {
-                "nodes": [
-                    {
-                        "id": "user-query-1",
-                        "type": "userQuery",
-                        "position": {"x": 100, "y": 100},
-                        "data": {
-                            "label": "Customer Question",
-                            "placeholder": "What can I help you with today?",
-                            "description": "Entry point for customer queries"
-                        }
-                    },
-                    {
-                        "id": "knowledge-base-1",
-                        "type": "knowledgeBase",
-                        "position": {"x": 300, "y": 100},
-                        "data": {
-                            "label": "Help Documentation",
-                            "description": "Search through help documents",
-                            "embeddingModel": "text-embedding-3-large",
-                            "chunkSize": 1000,
-                            "chunkOverlap": 200,
-                            "similarityThreshold": 0.7,
-                            "maxResults": 5
-                        }
-                    },
-                    {
-                        "id": "llm-1",
-                        "type": "llm",
-                        "position": {"x": 500, "y": 100},
-                        "data": {
-                            "label": "AI Assistant",
-                            "description": "Generate helpful responses",
-                            "model": "gpt-3.5-turbo",
-                            "prompt": "You are a helpful customer support assistant. Use the provided context to answer customer questions accurately and helpfully.",
-                            "temperature": 0.7,
-                            "maxTokens": 300
-                        }
-                    },
-                    {
-                        "id": "output-1",
-                        "type": "output",
-                        "position": {"x": 700, "y": 100},
-                        "data": {
-                            "label": "Support Response",
-                            "description": "Final response to customer",
-                            "format": "text",
-                            "includeSources": True,
-                            "includeMetadata": False
-                        }
+        dict(
+            {key: value for key, value in template.items() if key != "owner_idx"},
+            owner=users[template["owner_idx"]]
+        )
+        for template in WORKFLOWS_DATA
+    ]
+
+# user query -> knowledge base -> LLM -> output, shared by the linear templates
+STANDARD_EDGES = [
+    {"id": "edge-1", "source": "user-query-1", "target": "knowledge-base-1"},
+    {"id": "edge-2", "source": "knowledge-base-1", "target": "llm-1"},
+    {"id": "edge-3", "source": "llm-1", "target": "output-1"}
+]
+
+# Sample workflow configurations
+WORKFLOWS_DATA = [
+    {
+        "name": "Customer Support Bot",
+        "description": "AI-powered customer support workflow that answers questions using knowledge base",
+        "owner_idx": 0,  # Admin user
+        "configuration": {
+            "nodes": [
+                {
+                    "id": "user-query-1",
+                    "type": "userQuery",
+                    "position": {"x": 100, "y": 100},
+                    "data": {
+                        "label": "Customer Question",
+                        "placeholder": "What can I help you with today?",
+                        "description": "Entry point for customer queries"
+                    }
+                },
+                {
+                    "id": "knowledge-base-1",
+                    "type": "knowledgeBase",
+                    "position": {"x": 300, "y": 100},
+                    "data": {
+                        "label": "Help Documentation",
+                        "description": "Search through help documents",
+                        "embeddingModel": "text-embedding-3-large",
+                        "chunkSize": 1000,
+                        "chunkOverlap": 200,
+                        "similarityThreshold": 0.7,
+                        "maxResults": 5
+                    }
+                },
+                {
+                    "id": "llm-1",
+                    "type": "llm",
+                    "position": {"x": 500, "y": 100},
+                    "data": {
+                        "label": "AI Assistant",
+                        "description": "Generate helpful responses",
+                        "model": "gpt-3.5-turbo",
+                        "prompt": "You are a helpful customer support assistant. Use the provided context to answer customer questions accurately and helpfully.",
+                        "temperature": 0.7,
+                        "maxTokens": 300
                     }
-                ],
-                "edges": [
-                    {
-                        "id": "edge-1",
-                        "source": "user-query-1",
-                        "target": "knowledge-base-1"
-                    },
-                    {
-                        "id": "edge-2",
-                        "source": "knowledge-base-1",
-                        "target": "llm-1"
-                    },
-                    {
-                        "id": "edge-3",
-                        "source": "llm-1",
-                        "target": "output-1"
+                },
+                {
+                    "id": "output-1",
+                    "type": "output",
+                    "position": {"x": 700, "y": 100},
+                    "data": {
+                        "label": "Support Response",
+                        "description": "Final response to customer",
+                        "format": "text",
+                        "includeSources": True,
+                        "includeMetadata": False
                     }
-                ]
-            },
-            "category": "customer-support",
-            "tags": ["support", "chatbot", "knowledge-base"],
-            "is_active": True,
-            "is_public": True
+                }
+            ],
+            "edges": STANDARD_EDGES
         },
-        {
-            "name": "Document Q&A Assistant",
-            "description": "Upload documents and ask questions about their content",
-            "owner": users[1],  # Demo user
-            "configuration": {
-                "nodes": [
-                    {
-                        "id": "user-query-1",
-                        "type": "userQuery",
-                        "position": {"x": 100, "y": 100},
-                        "data": {
-                            "label": "Document Question",
-                            "placeholder": "Ask a question about your documents...",
-                            "description": "What would you like to know?"
-                        }
-                    },
-                    {
-                        "id": "knowledge-base-1",
-                        "type": "knowledgeBase",
-                        "position": {"x": 300, "y": 100},
-                        "data": {
-                            "label": "Uploaded Documents",
-                            "description": "Search through your documents",
-                            "embeddingModel": "text-embedding-3-large",
-                            "chunkSize": 800,
-                            "chunkOverlap": 150,
-                            "similarityThreshold": 0.75,
-                            "maxResults": 7
-                        }
-                    },
-                    {
-                        "id": "llm-1",
-                        "type": "llm",
-                        "position": {"x": 500, "y": 100},
-                        "data": {
-                            "label": "Document Analyzer",
-                            "description": "Analyze and answer based on documents",
-                            "model": "gpt-4",
-                            "prompt": "You are an expert document analyst. Answer questions based strictly on the provided document context. If the answer isn't in the documents, say so clearly.",
-                            "temperature": 0.3,
-                            "maxTokens": 500
-                        }
-                    },
-                    {
-                        "id": "output-1",
-                        "type": "output",
-                        "position": {"x": 700, "y": 100},
-                        "data": {
-                            "label": "Document Answer",
-                            "description": "Answer with source citations",
-                            "format": "markdown",
-                            "includeSources": True,
-                            "includeMetadata": True
-                        }
+        "category": "customer-support",
+        "tags": ["support", "chatbot", "knowledge-base"],
+        "is_active": True,
+        "is_public": True
+    },
+    {
+        "name": "Document Q&A Assistant",
+        "description": "Upload documents and ask questions about their content",
+        "owner_idx": 1,  # Demo user
+        "configuration": {
+            "nodes": [
+                {
+                    "id": "user-query-1",
+                    "type": "userQuery",
+                    "position": {"x": 100, "y": 100},
+                    "data": {
+                        "label": "Document Question",
+                        "placeholder": "Ask a question about your documents...",
+                        "description": "What would you like to know?"
                     }
-                ],
-                "edges": [
-                    {
-                        "id": "edge-1",
-                        "source": "user-query-1",
-                        "target": "knowledge-base-1"
-                    },
-                    {
-                        "id": "edge-2",
-                        "source": "knowledge-base-1",
-                        "target": "llm-1"
-                    },
-                    {
-                        "id": "edge-3",
-                        "source": "llm-1",
-                        "target": "output-1"
+                },
+                {
+                    "id": "knowledge-base-1",
+                    "type": "knowledgeBase",
+                    "position": {"x": 300, "y": 100},
+                    "data": {
+                        "label": "Uploaded Documents",
+                        "description": "Search through your documents",
+                        "embeddingModel": "text-embedding-3-large",
+                        "chunkSize": 800,
+                        "chunkOverlap": 150,
+                        "similarityThreshold": 0.75,
+                        "maxResults": 7
                     }
-                ]
-            },
-            "category": "document-analysis",
-            "tags": ["documents", "q&a", "analysis"],
-            "is_active": True,
-            "is_public": False
+                },
+                {
+                    "id": "llm-1",
+                    "type": "llm",
+                    "position": {"x": 500, "y": 100},
+                    "data": {
+                        "label": "Document Analyzer",
+                        "description": "Analyze and answer based on documents",
+                        "model": "gpt-4",
+                        "prompt": "You are an expert document analyst. Answer questions based strictly on the provided document context. If the answer isn't in the documents, say so clearly.",
+                        "temperature": 0.3,
+                        "maxTokens": 500
+                    }
+                },
+                {
+                    "id": "output-1",
+                    "type": "output",
+                    "position": {"x": 700, "y": 100},
+                    "data": {
+                        "label": "Document Answer",
+                        "description": "Answer with source citations",
+                        "format": "markdown",
+                        "includeSources": True,
+                        "includeMetadata": True
+                    }
+                }
+            ],
+            "edges": STANDARD_EDGES
         },
-        {
-            "name": "Research Assistant with Web Search",
-            "description": "AI assistant that can search the web for current information",
-            "owner": users[2],  # John Doe
-            "configuration": {
-                "nodes": [
-                    {
-                        "id": "user-query-1",
-                        "type": "userQuery",
-                        "position": {"x": 50, "y": 100},
-                        "data": {
-                            "label": "Research Query",
-                            "placeholder": "What would you like to research?",
-                            "description": "Enter your research question"
-                        }
-                    },
-                    {
-                        "id": "web-search-1",
-                        "type": "webSearch",
-                        "position": {"x": 250, "y": 50},
-                        "data": {
-                            "label": "Web Search",
-                            "description": "Search for current information",
-                            "searchEngine": "google",
-                            "maxResults": 5,
-                            "country": "us",
-                            "language": "en"
-                        }
-                    },
-                    {
-                        "id": "knowledge-base-1",
-                        "type": "knowledgeBase",
-                        "position": {"x": 250, "y": 150},
-                        "data": {
-                            "label": "Knowledge Base",
-                            "description": "Search existing
+        "category": "document-analysis",
+        "tags": ["documents", "q&a", "analysis"],
+        "is_active": True,
+        "is_public": False
+    },
+    {
+        "name": "Research Assistant with Web Search",
+        "description": "AI assistant that can search the web for current information",
+        "owner_idx": 2,  # John Doe
+        "configuration": {
+            "nodes": [
+                {
+                    "id": "user-query-1",
+                    "type": "userQuery",
+                    "position": {"x": 50, "y": 100},
+                    "data": {
+                        "label": "Research Query",
+                        "placeholder": "What would you like to research?",
+                        "description": "Enter your research question"
+                    }
+                },
+                {
+                    "id": "web-search-1",
+                    "type": "webSearch",
+                    "position": {"x": 250, "y": 50},
+                    "data": {
+                        "label": "Web Search",
+                        "description": "Search for current information",
+                        "searchEngine": "google",
+                        "maxResults": 5,
+                        "country": "us",
+                        "language": "en"
+                    }
+                },
+                {
+                    "id": "knowledge-base-1",
+                    "type": "knowledgeBase",
+                    "position": {"x": 250, "y": 150},
+                    "data": {
+                        "label": "Knowledge Base",
+                        "description": "Search existing